@@ -9,6 +9,7 @@ stock_agent = Agent(
 # NOTE: Python Path replace with yours: /Users/praison/miniconda3/envs/mcp/bin/python
 # NOTE: app.py file path, replace it with yours: /Users/praison/stockprice/app.py
 
-# stock_agent.start("What is the Stock Price of Apple?")
+if __name__ == "__main__":
+    # stock_agent.start("What is the Stock Price of Apple?")
 
-stock_agent.start("What is the Stock Price of NVIDIA?")
\ No newline at end of file
+    stock_agent.start("What is the Stock Price of NVIDIA?")
\ No newline at end of file
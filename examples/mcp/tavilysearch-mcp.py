@@ -13,4 +13,5 @@ search_agent = Agent(
     tools=MCP("npx -y tavily-mcp@0.1.4", env={"TAVILY_API_KEY": tavily_api_key})
 )
 
-search_agent.start("Search more information about AI News")
\ No newline at end of file
+if __name__ == "__main__":
+    search_agent.start("Search more information about AI News")
\ No newline at end of file
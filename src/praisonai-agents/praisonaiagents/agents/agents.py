@@ -433,6 +433,22 @@ Context:
         if retries == self.max_retries and task.status != "completed":
             logger.info(f"Task {task_id} failed after {self.max_retries} retries.")
 
+    async def _arun_parallel_tasks(self, task_ids):
+        """Run a batch of independent tasks concurrently.
+
+        Agents keep chat history, so tasks sharing an agent run one after
+        another; tasks of different agents run at the same time.
+        """
+        by_agent = {}
+        for task_id in task_ids:
+            by_agent.setdefault(id(self.tasks[task_id].agent), []).append(task_id)
+
+        async def run_in_order(agent_task_ids):
+            for task_id in agent_task_ids:
+                await self.arun_task(task_id)
+
+        await asyncio.gather(*[run_in_order(ids) for ids in by_agent.values()])
+
     async def arun_all_tasks(self):
         """Async version of run_all_tasks method"""
         process = Process(
@@ -447,21 +463,25 @@ Context:
             # Collect all tasks that should run in parallel
             parallel_tasks = []
             async for task_id in process.aworkflow():
-                if self.tasks[task_id].async_execution and self.tasks[task_id].is_start:
+                task = self.tasks[task_id]
+                # Independent async start tasks are batched; decision and loop
+                # tasks gate routing, so they always run before the workflow moves on
+                if task.async_execution and task.is_start and task.task_type not in ("decision", "loop"):
                     parallel_tasks.append(task_id)
-                elif parallel_tasks:
+                    continue
+                if parallel_tasks:
                     # Execute collected parallel tasks
-                    await asyncio.gather(*[self.arun_task(t) for t in parallel_tasks])
+                    await self._arun_parallel_tasks(parallel_tasks)
                     parallel_tasks = []
-                    # Run the current non-parallel task
-                    if self.tasks[task_id].async_execution:
-                        await self.arun_task(task_id)
-                    else:
-                        self.run_task(task_id)
+                # Run the current non-parallel task
+                if task.async_execution:
+                    await self.arun_task(task_id)
+                else:
+                    self.run_task(task_id)
             
             # Execute any remaining parallel tasks
             if parallel_tasks:
-                await asyncio.gather(*[self.arun_task(t) for t in parallel_tasks])
+                await self._arun_parallel_tasks(parallel_tasks)
                 
         elif self.process == "sequential":
             async for task_id in process.asequential():
@@ -6,21 +6,54 @@ from ..agent.agent import Agent
 from ..task.task import Task
 from ..main import display_error, client
 import csv
+import heapq
+import json
 import os
+from collections import Counter, deque
+from operator import attrgetter
+
+# Set up logger
+logger = logging.getLogger(__name__)
 
 class LoopItems(BaseModel):
     items: List[Any]
 
+class ManagerAssignment(BaseModel):
+    task_id: int
+    agent_name: str
+
+class ManagerPlan(BaseModel):
+    assignments: List[ManagerAssignment]
+
+# Framing of the hierarchical manager prompt; the task status list goes in between
+MANAGER_PROMPT_HEAD = """
+Here is the current status of all tasks except yours (manager_task):
+"""
+MANAGER_PROMPT_TAIL = """
+
+Plan the remaining work: list the tasks that still need to run, in the order
+they should run, each with the agent that should execute it. Return an empty
+list of assignments to stop.
+
+Provide a JSON with the structure:
+{
+   "assignments": [
+      {"task_id": <int>, "agent_name": "<string>"}
+   ]
+}
+"""
+
 class Process:
     DEFAULT_RETRY_LIMIT = 3  # Predefined retry limit in a common place
+    MANAGER_DESCRIPTION_LIMIT = 256  # Characters of each task description shown to the manager LLM
 
     def __init__(self, tasks: Dict[str, Task], agents: List[Agent], manager_llm: Optional[str] = None, verbose: bool = False, max_iter: int = 10):
-        logging.debug(f"=== Initializing Process ===")
-        logging.debug(f"Number of tasks: {len(tasks)}")
-        logging.debug(f"Number of agents: {len(agents)}")
-        logging.debug(f"Manager LLM: {manager_llm}")
-        logging.debug(f"Verbose mode: {verbose}")
-        logging.debug(f"Max iterations: {max_iter}")
+        logger.debug("=== Initializing Process ===")
+        logger.debug("Number of tasks: %s", len(tasks))
+        logger.debug("Number of agents: %s", len(agents))
+        logger.debug("Manager LLM: %s", manager_llm)
+        logger.debug("Verbose mode: %s", verbose)
+        logger.debug("Max iterations: %s", max_iter)
 
         self.tasks = tasks
         self.agents = agents
@@ -29,113 +62,386 @@ class Process:
         self.max_iter = max_iter
         self.task_retry_counter: Dict[str, int] = {} # Initialize retry counter
         self.workflow_finished = False # ADDED: Workflow finished flag
+        # Indexes kept in sync as tasks are added and change status, so the
+        # workflow loop doesn't rescan every task for lookups and fallbacks
+        self._tasks_by_name: Dict[str, Task] = {}
+        self._agents_by_name: Dict[str, Agent] = {}
+        self._agents_indexed = 0  # len(self.agents) when _agents_by_name was built
+        self._task_order: Dict[str, int] = {}
+        self._not_started = set()
+        # Heap of (declaration position, id) for 'not started' tasks, popped in
+        # order by the fallback; _ready_ids are the ids currently in the heap
+        self._ready = []
+        self._ready_ids = set()
+        self._with_context = set()
+        self._graph_built = False
+        # Loop subtasks by parent loop name, and subtask id -> parent loop name
+        self._subtasks_by_parent: Dict[str, List[Task]] = {}
+        self._subtask_parent: Dict[Any, str] = {}
+        # Each loop's subtask ids in creation order, popped from the front once
+        # seen completed; _subtask_queued holds the ids currently in a queue
+        self._subtask_pending: Dict[str, deque] = {}
+        self._subtask_queued = set()
+        # Id of the last task found not completed, checked first by _all_tasks_completed
+        self._incomplete_hint = None
+        for task in tasks.values():
+            self._index_task(task)
+        # Tasks named "<loop name>_..." belong to that loop, as with generated subtasks.
+        # Whether the loop was already expanded is kept on the loop task itself
+        # (_subtasks_created), so a later run over the same tasks doesn't expand it again
+        for loop_task in tasks.values():
+            if loop_task.task_type == "loop" and loop_task.name:
+                prefix = loop_task.name + "_"
+                for task in tasks.values():
+                    if task.name and task.name.startswith(prefix):
+                        self._register_subtask(task, loop_task)
+
+    def _index_task(self, task: Task):
+        """Add a task to the lookup indexes used by the workflow loop."""
+        self._tasks_by_name.setdefault(task.name, task)
+        self._task_order[task.id] = len(self._task_order)
+        if task.status == "not started":
+            self._mark_not_started(task.id)
+        if 'Input data from previous tasks:' in task.description:
+            self._with_context.add(task.id)
+
+    def _register_subtask(self, task: Task, loop_task: Task):
+        """Record ``task`` as a subtask of ``loop_task``."""
+        self._subtasks_by_parent.setdefault(loop_task.name, []).append(task)
+        self._subtask_parent[task.id] = loop_task.name
+        if task.status != "completed":
+            self._queue_subtask(task.id, loop_task.name)
+
+    def _queue_subtask(self, task_id, loop_name: str):
+        """Put a subtask back on its loop's pending queue if it isn't queued."""
+        if task_id not in self._subtask_queued:
+            self._subtask_queued.add(task_id)
+            self._subtask_pending.setdefault(loop_name, deque()).append(task_id)
+
+    def _has_pending_subtasks(self, loop_name: str) -> bool:
+        """Return True while any subtask of a loop is not completed.
+
+        Subtasks are completed by the executor outside of Process, so the
+        queue is popped here while its front subtask is completed; subtasks
+        mostly finish in order, which keeps this close to O(1) per call.
+        """
+        pending = self._subtask_pending.get(loop_name)
+        while pending:
+            task_id = pending[0]
+            if self.tasks[task_id].status != "completed":
+                return True
+            pending.popleft()
+            self._subtask_queued.discard(task_id)
+        return False
+
+    def _add_task(self, task: Task, loop_task: Optional[Task] = None):
+        """Register a task created while the workflow runs (e.g. loop subtasks)."""
+        self.tasks[task.id] = task
+        self._index_task(task)
+        if loop_task is not None:
+            self._register_subtask(task, loop_task)
+        self._graph_built = False  # Relink next_tasks on the next workflow run
+
+    def _mark_not_started(self, task_id):
+        """Add a task to the 'not started' index and the fallback's ready heap."""
+        self._not_started.add(task_id)
+        if task_id not in self._ready_ids:
+            self._ready_ids.add(task_id)
+            heapq.heappush(self._ready, (self._task_order[task_id], task_id))
+
+    def _get_agent(self, name: str) -> Optional[Agent]:
+        """Look up an agent by name, reindexing if agents were added since."""
+        if self._agents_indexed != len(self.agents):
+            self._agents_by_name = {}
+            for agent in self.agents:
+                # First agent with a given name wins, as the manager lookup always did
+                self._agents_by_name.setdefault(agent.name, agent)
+            self._agents_indexed = len(self.agents)
+        return self._agents_by_name.get(name)
+
+    def _set_status(self, task: Task, status: str):
+        """Update a task's status and the 'not started' index with it."""
+        task.status = status
+        if status == "not started":
+            self._mark_not_started(task.id)
+        else:
+            self._not_started.discard(task.id)
+        parent_name = self._subtask_parent.get(task.id)
+        if parent_name is not None:
+            if status != "completed":
+                self._queue_subtask(task.id, parent_name)
+
+    def _get_condition_target(self, task: Task, decision_str: str):
+        """Look up a (lowercased) decision in ``task.condition``, ignoring key case."""
+        # Task lowercases its condition keys, so this usually hits directly;
+        # the scan covers conditions assigned or edited after construction
+        target = task.condition.get(decision_str)
+        if target is not None:
+            return target
+        for key, value in task.condition.items():
+            if str(key).lower() == decision_str:
+                return value
+        return []
+
+    def _summarize_tasks(self, cache: Dict[Any, tuple]) -> str:
+        """Render the task status list sent to the manager LLM as a JSON array.
+
+        Each task's entry is re-rendered (and logged) only when its status,
+        agent or description changed since the previous call; ``cache`` keeps
+        the rendered entries between calls.
+        """
+        entries = []
+        for tid, tk in self.tasks.items():
+            if tk.name == "manager_task":
+                continue
+            status = tk.status if tk.status else "not started"
+            agent_name = tk.agent.name if tk.agent else "No agent"
+            cached = cache.get(tid)
+            if cached is None or cached[:3] != (status, agent_name, tk.description):
+                # The manager only routes tasks, so a description head is enough
+                description = tk.description
+                if len(description) > self.MANAGER_DESCRIPTION_LIMIT:
+                    description = description[:self.MANAGER_DESCRIPTION_LIMIT] + "..."
+                task_info = {
+                    "task_id": tid,
+                    "name": tk.name,
+                    "description": description,
+                    "status": status,
+                    "agent": agent_name
+                }
+                cached = (status, agent_name, tk.description, json.dumps(task_info, ensure_ascii=False, default=str))
+                cache[tid] = cached
+                logger.info("Task %s status: %s", tid, task_info)
+            entries.append(cached[3])
+        return "[" + ", ".join(entries) + "]"
 
     def _find_next_not_started_task(self) -> Optional[Task]:
         """Fallback mechanism to find the next 'not started' task."""
-        fallback_attempts = 0
-        temp_current_task = None
-        
         # Clear previous task context before finding next task
+        for task_id in self._with_context:
+            task = self.tasks[task_id]
+            task.description = task.description.split('Input data from previous tasks:')[0].strip()
+        self._with_context.clear()
+
+        if not self._not_started:
+            return None
+
+        # Nothing changes between scans, so a single pass decides: a task skipped
+        # for having no path, or failed for running out of retries, stays that way
+        logger.debug("Fallback: Trying to find next 'not started' task.")
+        # Candidates are popped in declaration order; the ones still
+        # 'not started' are pushed back once the scan is over
+        found = None
+        kept = []
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            task_id = entry[1]
+            if task_id not in self._not_started:
+                self._ready_ids.discard(task_id)
+                continue
+            task_candidate = self.tasks[task_id]
+            if task_candidate.status != "not started":
+                # Status was changed outside the process (e.g. by the executor)
+                self._not_started.discard(task_id)
+                self._ready_ids.discard(task_id)
+                continue
+            kept.append(entry)
+
+            # Check if there's a condition path to this task
+            current_conditions = task_candidate.condition or {}
+            leads_to_task = any(
+                task_value for task_value in current_conditions.values()
+                if isinstance(task_value, (list, str)) and task_value
+            )
+
+            if not leads_to_task and not task_candidate.next_tasks:
+                continue  # Skip if no valid path exists
+
+            retry_count = self.task_retry_counter.get(task_candidate.id, 0)
+            if retry_count < Process.DEFAULT_RETRY_LIMIT:
+                self.task_retry_counter[task_candidate.id] = retry_count + 1
+                found = task_candidate
+                logger.debug("Fallback: Found 'not started' task: %s, retry count: %s", found.name, retry_count + 1)
+                break
+            else:
+                logger.debug("Max retries reached for task %s in fallback mode, marking as failed.", task_candidate.name)
+                kept.pop()
+                self._ready_ids.discard(task_id)
+                self._set_status(task_candidate, "failed")
+        for entry in kept:
+            heapq.heappush(self._ready, entry)
+        if not found:
+            logger.debug("Fallback: No 'not started' task found within retry limit.")
+        return found
+
+    def _build_graph(self):
+        """Link previous_tasks from next_tasks once per process."""
+        # No task order is derived from the graph: decisions, loop expansion and
+        # resets route the workflow at runtime, and the fallback keeps declaration order
+        if self._graph_built:
+            return
+        logger.debug("Building workflow relationships...")
+        # Names already in each task's previous_tasks; tasks outlive a Process,
+        # so links from an earlier run must not be appended again
+        linked: Dict[Any, set] = {}
         for task in self.tasks.values():
-            if hasattr(task, 'description') and 'Input data from previous tasks:' in task.description:
-                task.description = task.description.split('Input data from previous tasks:')[0].strip()
-        
-        while fallback_attempts < Process.DEFAULT_RETRY_LIMIT and not temp_current_task:
-            fallback_attempts += 1
-            logging.debug(f"Fallback attempt {fallback_attempts}: Trying to find next 'not started' task.")
-            for task_candidate in self.tasks.values():
-                if task_candidate.status == "not started":
-                    # Check if there's a condition path to this task
-                    current_conditions = task_candidate.condition or {}
-                    leads_to_task = any(
-                        task_value for task_value in current_conditions.values() 
-                        if isinstance(task_value, (list, str)) and task_value
-                    )
-                    
-                    if not leads_to_task and not task_candidate.next_tasks:
-                        continue  # Skip if no valid path exists
-                        
-                    if self.task_retry_counter.get(task_candidate.id, 0) < Process.DEFAULT_RETRY_LIMIT:
-                        self.task_retry_counter[task_candidate.id] = self.task_retry_counter.get(task_candidate.id, 0) + 1
-                        temp_current_task = task_candidate
-                        logging.debug(f"Fallback attempt {fallback_attempts}: Found 'not started' task: {temp_current_task.name}, retry count: {self.task_retry_counter[temp_current_task.id]}")
-                        return temp_current_task # Return the found task immediately
-                    else:
-                        logging.debug(f"Max retries reached for task {task_candidate.name} in fallback mode, marking as failed.")
-                        task_candidate.status = "failed"
-            if not temp_current_task:
-                logging.debug(f"Fallback attempt {fallback_attempts}: No 'not started' task found within retry limit.")
-        return None # Return None if no task found after all attempts
-
+            for next_task_name in task.next_tasks:
+                next_task = self._tasks_by_name.get(next_task_name)
+                if next_task:
+                    seen = linked.get(next_task.id)
+                    if seen is None:
+                        seen = linked[next_task.id] = set(next_task.previous_tasks)
+                    if task.name not in seen:
+                        seen.add(task.name)
+                        next_task.previous_tasks.append(task.name)
+                    logger.debug("Added %s as previous task for %s", task.name, next_task_name)
+        self._graph_built = True
+
+    def _build_loop_subtasks(self, loop_task: Task) -> List[Task]:
+        """Create chained subtasks for a loop task, one per row/line of its input file."""
+        # Values shared by every subtask
+        desc_prefix = f"{loop_task.description}\n" if loop_task.description else ""
+        name_prefix = f"{loop_task.name}_" if loop_task.name else None
+        expected_output = getattr(loop_task, 'expected_output', None)
+        row_agent = loop_task.agent
+        add_task = self._add_task
+        new_tasks = []
+        previous_task = None
+        file_ext = os.path.splitext(loop_task.input_file)[1].lower()
+        with open(loop_task.input_file, "r", encoding="utf-8", newline="") as f:
+            # Rows are turned into tasks as the file is read, so only the
+            # current line is held besides the tasks themselves
+            if file_ext == ".csv":
+                # First column of each non-empty row
+                items = ((i, row[0]) for i, row in enumerate(csv.reader(f)) if row)
+            else:
+                items = ((i, line.strip()) for i, line in enumerate(f))
+            for i, item in items:
+                row_task = Task(
+                    description=desc_prefix + item,
+                    agent=row_agent,
+                    name=f"{name_prefix}{i+1}" if name_prefix else item,
+                    expected_output=expected_output,
+                    is_start=(i == 0),
+                    task_type="task",
+                    condition={"complete": ["next"], "retry": ["current"]}
+                )
+                add_task(row_task, loop_task)
+                new_tasks.append(row_task)
+
+                if previous_task:
+                    previous_task.next_tasks = [row_task.name]
+                    previous_task.condition["complete"] = [row_task.name]
+                previous_task = row_task
+        return new_tasks
+
+    def _create_loop_subtasks(self, loop_task: Task):
+        """Expand a loop task into its subtasks and point it at the first one."""
+        try:
+            new_tasks = self._build_loop_subtasks(loop_task)
+            if new_tasks:
+                loop_task.next_tasks = [new_tasks[0].name]
+                loop_task._subtasks_created = True
+                logger.info("Created %s tasks from: %s for loop task %s", len(new_tasks), loop_task.input_file, loop_task.name)
+        except Exception as e:
+            logger.error("Failed to read file tasks for loop task %s: %s", loop_task.name, e)
+
+    def _all_tasks_completed(self) -> bool:
+        """Return True if every task is completed.
+
+        The last incomplete task seen, then one task from the 'not started'
+        index, are checked first, so most cycles answer without walking the
+        whole task dict.
+        """
+        hint = self.tasks.get(self._incomplete_hint)
+        if hint is not None and hint.status != "completed":
+            return False
+        # Any task still in the 'not started' index answers it too
+        task_id = next(iter(self._not_started), None)
+        if task_id is not None and self.tasks[task_id].status != "completed":
+            self._incomplete_hint = task_id
+            return False
+        for task in self.tasks.values():
+            if task.status != "completed":
+                self._incomplete_hint = task.id
+                return False
+        return True
+
+    def _count_tasks(self):
+        """Count tasks by status and by type in a single pass over all tasks."""
+        status_counts = {"not started": 0, "in progress": 0, "completed": 0, "failed": 0}
+        type_counts = {"loop": 0, "decision": 0, "regular": 0}
+        # Count (status, type) pairs in C, then fold the handful of distinct pairs
+        pairs = Counter(map(attrgetter("status", "task_type"), self.tasks.values()))
+        for (status, task_type), count in pairs.items():
+            status = status.replace("_", " ")
+            status_counts[status] = status_counts.get(status, 0) + count
+            type_counts[task_type if task_type in ("loop", "decision") else "regular"] += count
+        return status_counts, type_counts
 
     async def aworkflow(self) -> AsyncGenerator[str, None]:
         """Async version of workflow method"""
-        logging.debug("=== Starting Async Workflow ===")
+        logger.debug("=== Starting Async Workflow ===")
         current_iter = 0  # Track how many times we've looped
         # Build workflow relationships first
-        logging.debug("Building workflow relationships...")
-        for task in self.tasks.values():
-            if task.next_tasks:
-                for next_task_name in task.next_tasks:
-                    next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
-                    if next_task:
-                        next_task.previous_tasks.append(task.name)
-                        logging.debug(f"Added {task.name} as previous task for {next_task_name}")
+        self._build_graph()
 
         # Find start task
-        logging.debug("Finding start task...")
+        logger.debug("Finding start task...")
         start_task = None
         for task_id, task in self.tasks.items():
             if task.is_start:
                 start_task = task
-                logging.debug(f"Found marked start task: {task.name} (id: {task_id})")
+                logger.debug("Found marked start task: %s (id: %s)", task.name, task_id)
                 break
 
         if not start_task:
-            start_task = list(self.tasks.values())[0]
-            logging.debug(f"No start task marked, using first task: {start_task.name}")
+            start_task = next(iter(self.tasks.values()))
+            logger.debug("No start task marked, using first task: %s", start_task.name)
 
         current_task = start_task
         visited_tasks = set()
-        loop_data = {}  # Store loop-specific data
 
         # TODO: start task with loop feature is not available in aworkflow method
 
         while current_task:
             current_iter += 1
             if current_iter > self.max_iter:
-                logging.info(f"Max iteration limit {self.max_iter} reached, ending workflow.")
+                logger.info("Max iteration limit %s reached, ending workflow.", self.max_iter)
                 break
 
             # ADDED: Check workflow finished flag at the start of each cycle
             if self.workflow_finished:
-                logging.info("Workflow finished early as all tasks are completed.")
+                logger.info("Workflow finished early as all tasks are completed.")
                 break
 
             # Add task summary at start of each cycle
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                status_counts, type_counts = self._count_tasks()
+                logger.debug(f"""
 === Workflow Cycle {current_iter} Summary ===
 Total tasks: {len(self.tasks)}
-Outstanding tasks: {sum(1 for t in self.tasks.values() if t.status != "completed")}
-Completed tasks: {sum(1 for t in self.tasks.values() if t.status == "completed")}
+Outstanding tasks: {len(self.tasks) - status_counts["completed"]}
+Completed tasks: {status_counts["completed"]}
 Tasks by status:
-- Not started: {sum(1 for t in self.tasks.values() if t.status == "not started")}
-- In progress: {sum(1 for t in self.tasks.values() if t.status == "in_progress")}
-- Completed: {sum(1 for t in self.tasks.values() if t.status == "completed")}
+- Not started: {status_counts["not started"]}
+- In progress: {status_counts["in progress"]}
+- Completed: {status_counts["completed"]}
 Tasks by type:
-- Loop tasks: {sum(1 for t in self.tasks.values() if t.task_type == "loop")}
-- Decision tasks: {sum(1 for t in self.tasks.values() if t.task_type == "decision")}
-- Regular tasks: {sum(1 for t in self.tasks.values() if t.task_type not in ["loop", "decision"])}
-            """)
+- Loop tasks: {type_counts["loop"]}
+- Decision tasks: {type_counts["decision"]}
+- Regular tasks: {type_counts["regular"]}
+                """)
 
             # ADDED: Check if all tasks are completed and set workflow_finished flag
-            if all(task.status == "completed" for task in self.tasks.values()):
-                logging.info("All tasks are completed.")
+            if self._all_tasks_completed():
+                logger.info("All tasks are completed.")
                 self.workflow_finished = True
                 # The next iteration loop check will break the workflow
 
             task_id = current_task.id
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"""
 === Task Execution Details ===
 Current task: {current_task.name}
 Type: {current_task.task_type}
@@ -144,34 +450,32 @@ Previous tasks: {current_task.previous_tasks}
 Next tasks: {current_task.next_tasks}
 Context tasks: {[t.name for t in current_task.context] if current_task.context else []}
 Description length: {len(current_task.description)}
-            """)
+                """)
 
             # Add context from previous tasks to description
             if current_task.previous_tasks or current_task.context:
-                context = "\nInput data from previous tasks:"
+                context_parts = ["\nInput data from previous tasks:"]
 
                 # Add data from previous tasks in workflow
                 for prev_name in current_task.previous_tasks:
-                    prev_task = next((t for t in self.tasks.values() if t.name == prev_name), None)
+                    prev_task = self._tasks_by_name.get(prev_name)
                     if prev_task and prev_task.result:
-                        # Handle loop data
-                        if current_task.task_type == "loop":
-                            context += f"\n{prev_name}: {prev_task.result.raw}"
-                        else:
-                            context += f"\n{prev_name}: {prev_task.result.raw}"
+                        context_parts.append(f"\n{prev_name}: {prev_task.result.raw}")
 
                 # Add data from context tasks
                 if current_task.context:
                     for ctx_task in current_task.context:
                         if ctx_task.result and ctx_task.name != current_task.name:
-                            context += f"\n{ctx_task.name}: {ctx_task.result.raw}"
+                            context_parts.append(f"\n{ctx_task.name}: {ctx_task.result.raw}")
 
                 # Update task description with context
-                current_task.description = current_task.description + context
+                current_task.description = current_task.description + "".join(context_parts)
+                self._with_context.add(current_task.id)
 
             # Skip execution for loop tasks, only process their subtasks
             if current_task.task_type == "loop":
-                logging.debug(f"""
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"""
 === Loop Task Details ===
 Name: {current_task.name}
 ID: {current_task.id}
@@ -180,42 +484,41 @@ Next tasks: {current_task.next_tasks}
 Condition: {current_task.condition}
 Subtasks created: {getattr(current_task, '_subtasks_created', False)}
 Input file: {getattr(current_task, 'input_file', None)}
-                """)
+                    """)
 
                 # Check if subtasks are created and completed
                 if getattr(current_task, "_subtasks_created", False):
-                    subtasks = [
-                        t for t in self.tasks.values()
-                        if t.name.startswith(current_task.name + "_")
-                    ]
-                    logging.debug(f"""
+                    subtasks = self._subtasks_by_parent.get(current_task.name, [])
+                    if logger.isEnabledFor(logging.DEBUG):
+                        completed_subtasks = sum(1 for st in subtasks if st.status == "completed")
+                        logger.debug(f"""
 === Subtask Status Check ===
 Total subtasks: {len(subtasks)}
-Completed: {sum(1 for st in subtasks if st.status == "completed")}
-Pending: {sum(1 for st in subtasks if st.status != "completed")}
-                    """)
+Completed: {completed_subtasks}
+Pending: {len(subtasks) - completed_subtasks}
+                        """)
 
-                    # Log detailed subtask info
-                    for st in subtasks:
-                        logging.debug(f"""
+                        # Log detailed subtask info
+                        for st in subtasks:
+                            logger.debug(f"""
 Subtask: {st.name}
 - Status: {st.status}
 - Next tasks: {st.next_tasks}
 - Condition: {st.condition}
-                        """)
+                            """)
 
-                    if subtasks and all(st.status == "completed" for st in subtasks):
-                        logging.debug(f"=== All {len(subtasks)} subtasks completed for {current_task.name} ===")
+                    if subtasks and not self._has_pending_subtasks(current_task.name):
+                        logger.debug("=== All %s subtasks completed for %s ===", len(subtasks), current_task.name)
 
                         # Mark loop task completed and move to next task
-                        current_task.status = "completed"
-                        logging.debug(f"Loop {current_task.name} marked as completed")
+                        self._set_status(current_task, "completed")
+                        logger.debug("Loop %s marked as completed", current_task.name)
 
                         # Set result for loop task when all subtasks complete
                         if not current_task.result:
-                            # Get result from last completed subtask
-                            last_subtask = next((t for t in reversed(subtasks) if t.status == "completed"), None)
-                            if last_subtask and last_subtask.result:
+                            # Get result from last completed subtask (all of them are completed here)
+                            last_subtask = subtasks[-1]
+                            if last_subtask.result:
                                 current_task.result = last_subtask.result
                         
                         # Route to next task based on condition
@@ -229,15 +532,15 @@ Subtask: {st.name}
                                     decision_str = current_task.result.raw.lower()
                             
                             # For loop tasks, use "done" to follow condition path
-                            if current_task.task_type == "loop" and all(t.status == "completed" for t in subtasks):
+                            if current_task.task_type == "loop":
                                 decision_str = "done"
                             
-                            target_tasks = current_task.condition.get(decision_str, []) if decision_str else []
+                            target_tasks = self._get_condition_target(current_task, decision_str) if decision_str else []
                             task_value = target_tasks[0] if isinstance(target_tasks, list) else target_tasks
-                            next_task = next((t for t in self.tasks.values() if t.name == task_value), None)
+                            next_task = self._tasks_by_name.get(task_value)
                             if next_task:
-                                next_task.status = "not started"  # Reset status to allow execution
-                                logging.debug(f"Routing to {next_task.name} based on decision: {decision_str}")
+                                self._set_status(next_task, "not started")  # Reset status to allow execution
+                                logger.debug("Routing to %s based on decision: %s", next_task.name, decision_str)
                                 self.workflow_finished = False
                                 current_task = next_task
                                 # Ensure the task is yielded for execution
@@ -246,82 +549,62 @@ Subtask: {st.name}
                                     visited_tasks.add(current_task.id)
                             else:
                                 # End workflow if no valid next task found
-                                logging.info(f"No valid next task found for decision: {decision_str}")
+                                logger.info("No valid next task found for decision: %s", decision_str)
                                 self.workflow_finished = True
                                 current_task = None
                                 break
                 else:
-                    logging.debug(f"No subtasks created yet for {current_task.name}")
+                    logger.debug("No subtasks created yet for %s", current_task.name)
                     # Create subtasks if needed
                     if current_task.input_file:
                         self._create_loop_subtasks(current_task)
                         current_task._subtasks_created = True
-                        logging.debug(f"Created subtasks from {current_task.input_file}")
+                        logger.debug("Created subtasks from %s", current_task.input_file)
                     else:
                         # No input file, mark as done
-                        current_task.status = "completed"
-                        logging.debug(f"No input file, marking {current_task.name} as completed")
+                        self._set_status(current_task, "completed")
+                        logger.debug("No input file, marking %s as completed", current_task.name)
                         if current_task.next_tasks:
                             next_task_name = current_task.next_tasks[0]
-                            next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
+                            next_task = self._tasks_by_name.get(next_task_name)
                             current_task = next_task
                         else:
                             current_task = None
             else:
                 # Execute non-loop task
-                logging.debug(f"=== Executing non-loop task: {current_task.name} (id: {task_id}) ===")
-                logging.debug(f"Task status: {current_task.status}")
-                logging.debug(f"Task next_tasks: {current_task.next_tasks}")
+                logger.debug("=== Executing non-loop task: %s (id: %s) ===", current_task.name, task_id)
+                logger.debug("Task status: %s", current_task.status)
+                logger.debug("Task next_tasks: %s", current_task.next_tasks)
                 yield task_id
                 visited_tasks.add(task_id)
 
                 # Only end workflow if no next_tasks AND no conditions
-                if not current_task.next_tasks and not current_task.condition and not any(
-                    t.task_type == "loop" and current_task.name.startswith(t.name + "_")
-                    for t in self.tasks.values()
-                ):
-                    logging.info(f"Task {current_task.name} has no next tasks, ending workflow")
+                if (not current_task.next_tasks and not current_task.condition and
+                    current_task.id not in self._subtask_parent):
+                    logger.info("Task %s has no next tasks, ending workflow", current_task.name)
                     self.workflow_finished = True
                     current_task = None
                     break
 
             # Reset completed task to "not started" so it can run again
-            if self.tasks[task_id].status == "completed":
+            task_to_check = self.tasks[task_id]
+            if task_to_check.status == "completed":
                 # Never reset loop tasks, decision tasks, or their subtasks if rerun is False
-                subtask_name = self.tasks[task_id].name
-                task_to_check = self.tasks[task_id]
-                logging.debug(f"=== Checking reset for completed task: {subtask_name} ===")
-                logging.debug(f"Task type: {task_to_check.task_type}")
-                logging.debug(f"Task status before reset check: {task_to_check.status}")
-                logging.debug(f"Task rerun: {getattr(task_to_check, 'rerun', True)}") # default to True if not set
-
-                if (getattr(task_to_check, 'rerun', True) and # Corrected condition - reset only if rerun is True (or default True)
+                subtask_name = task_to_check.name
+                logger.debug("=== Checking reset for completed task: %s ===", subtask_name)
+                logger.debug("Task type: %s", task_to_check.task_type)
+                logger.debug("Task status before reset check: %s", task_to_check.status)
+                logger.debug("Task rerun: %s", getattr(task_to_check, 'rerun', True)) # default to True if not set
+
+                if (task_id not in self._subtask_parent and # Loop subtasks are indexed when created
                     task_to_check.task_type != "loop" and # Removed "decision" from exclusion
-                    not any(t.task_type == "loop" and subtask_name.startswith(t.name + "_")
-                           for t in self.tasks.values())):
-                    logging.debug(f"=== Resetting non-loop, non-decision task {subtask_name} to 'not started' ===")
-                    self.tasks[task_id].status = "not started"
-                    logging.debug(f"Task status after reset: {self.tasks[task_id].status}")
+                    getattr(task_to_check, 'rerun', True)): # Corrected condition - reset only if rerun is True (or default True)
+                    logger.debug("=== Resetting non-loop, non-decision task %s to 'not started' ===", subtask_name)
+                    self._set_status(task_to_check, "not started")
+                    logger.debug("Task status after reset: %s", task_to_check.status)
                 else:
-                    logging.debug(f"=== Skipping reset for loop/decision/subtask or rerun=False: {subtask_name} ===")
-                    logging.debug(f"Keeping status as: {self.tasks[task_id].status}")
-
-            # Handle loop progression
-            if current_task.task_type == "loop":
-                loop_key = f"loop_{current_task.name}"
-                if loop_key in loop_data:
-                    loop_info = loop_data[loop_key]
-                    loop_info["index"] += 1
-                    has_more = loop_info["remaining"] > 0
-
-                    # Update result to trigger correct condition
-                    if current_task.result:
-                        result = current_task.result.raw
-                        if has_more:
-                            result += "\nmore"
-                        else:
-                            result += "\ndone"
-                        current_task.result.raw = result
+                    logger.debug("=== Skipping reset for loop/decision/subtask or rerun=False: %s ===", subtask_name)
+                    logger.debug("Keeping status as: %s", task_to_check.status)
 
             # Determine next task based on result
             next_task = None
@@ -335,76 +618,78 @@ Subtask: {st.name}
                     # Check if task has conditions and next_tasks
                     if current_task.condition:
                         # Get target task based on decision
-                        target_tasks = current_task.condition.get(decision_str, [])
+                        target_tasks = self._get_condition_target(current_task, decision_str)
                         # Handle all forms of exit conditions
                         if not target_tasks or target_tasks == "exit" or (isinstance(target_tasks, list) and (not target_tasks or target_tasks[0] == "exit")):
-                            logging.info(f"Workflow exit condition met on decision: {decision_str}")
+                            logger.info("Workflow exit condition met on decision: %s", decision_str)
                             self.workflow_finished = True
                             current_task = None
                             break
                         else:
                             # Find the target task by name
                             task_value = target_tasks[0] if isinstance(target_tasks, list) else target_tasks
-                            next_task = next((t for t in self.tasks.values() if t.name == task_value), None)
+                            next_task = self._tasks_by_name.get(task_value)
                             if next_task:
-                                next_task.status = "not started"  # Reset status to allow execution
-                                logging.debug(f"Routing to {next_task.name} based on decision: {decision_str}")
+                                self._set_status(next_task, "not started")  # Reset status to allow execution
+                                logger.debug("Routing to %s based on decision: %s", next_task.name, decision_str)
                                 # Don't mark workflow as finished when following condition path
                                 self.workflow_finished = False
 
             # If no condition-based routing, use next_tasks
             if not next_task and current_task and current_task.next_tasks:
                 next_task_name = current_task.next_tasks[0]
-                next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
+                next_task = self._tasks_by_name.get(next_task_name)
                 if next_task:
                     # Reset the next task to allow re-execution
-                    next_task.status = "not started"
+                    self._set_status(next_task, "not started")
                     # Don't mark workflow as finished if we're in a task loop
                     if (next_task.previous_tasks and current_task.name in next_task.previous_tasks and 
                         next_task.next_tasks and 
                         next_task.next_tasks[0] in self.tasks and 
                         next_task.name in self.tasks[next_task.next_tasks[0]].previous_tasks):
                         self.workflow_finished = False
-                    logging.debug(f"Following next_tasks to {next_task.name}")
+                    logger.debug("Following next_tasks to %s", next_task.name)
 
-            current_task = next_task
-            if not current_task:
-                current_task = self._find_next_not_started_task() # General fallback if no next task in workflow
+            # General fallback if no next task in workflow
+            current_task = next_task or self._find_next_not_started_task()
 
 
             if not current_task:
                 # Add final workflow summary
-                logging.debug(f"""
+                if logger.isEnabledFor(logging.DEBUG):
+                    status_counts, type_counts = self._count_tasks()
+                    logger.debug(f"""
 === Final Workflow Summary ===
 Total tasks processed: {len(self.tasks)}
 Final status:
-- Completed tasks: {sum(1 for t in self.tasks.values() if t.status == "completed")}
-- Outstanding tasks: {sum(1 for t in self.tasks.values() if t.status != "completed")}
+- Completed tasks: {status_counts["completed"]}
+- Outstanding tasks: {len(self.tasks) - status_counts["completed"]}
 Tasks by status:
-- Not started: {sum(1 for t in self.tasks.values() if t.status == "not started")}
-- In progress: {sum(1 for t in self.tasks.values() if t.status == "in_progress")}
-- Completed: {sum(1 for t in self.tasks.values() if t.status == "completed")}
-- Failed: {sum(1 for t in self.tasks.values() if t.status == "failed")}
+- Not started: {status_counts["not started"]}
+- In progress: {status_counts["in progress"]}
+- Completed: {status_counts["completed"]}
+- Failed: {status_counts["failed"]}
 Tasks by type:
-- Loop tasks: {sum(1 for t in self.tasks.values() if t.task_type == "loop")}
-- Decision tasks: {sum(1 for t in self.tasks.values() if t.task_type == "decision")}
-- Regular tasks: {sum(1 for t in self.tasks.values() if t.task_type not in ["loop", "decision"])}
+- Loop tasks: {type_counts["loop"]}
+- Decision tasks: {type_counts["decision"]}
+- Regular tasks: {type_counts["regular"]}
 Total iterations: {current_iter}
 Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
-                """)
+                    """)
 
-                logging.info("Workflow execution completed")
+                logger.info("Workflow execution completed")
                 break
 
             # Add completion logging
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"""
 === Task Completion ===
 Task: {current_task.name}
 Final status: {current_task.status}
 Next task: {next_task.name if next_task else None}
 Iteration: {current_iter}/{self.max_iter}
 Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
-            """)
+                """)
 
     async def asequential(self) -> AsyncGenerator[str, None]:
         """Async version of sequential method"""
@@ -414,7 +699,7 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
 
     async def ahierarchical(self) -> AsyncGenerator[str, None]:
         """Async version of hierarchical method"""
-        logging.debug(f"Starting hierarchical task execution with {len(self.tasks)} tasks")
+        logger.debug("Starting hierarchical task execution with %s tasks", len(self.tasks))
         manager_agent = Agent(
             name="Manager",
             role="Project manager",
@@ -426,11 +711,6 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
             self_reflect=False
         )
 
-        class ManagerInstructions(BaseModel):
-            task_id: int
-            agent_name: str
-            action: str
-
         manager_task = Task(
             name="manager_task",
             description="Decide the order of tasks and which agent executes them",
@@ -438,41 +718,20 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
             agent=manager_agent
         )
         manager_task_id = yield manager_task
-        logging.info(f"Created manager task with ID {manager_task_id}")
+        logger.info("Created manager task with ID %s", manager_task_id)
 
-        completed_count = 0
+        completed_ids = set()
         total_tasks = len(self.tasks) - 1
-        logging.info(f"Need to complete {total_tasks} tasks (excluding manager task)")
-
-        while completed_count < total_tasks:
-            tasks_summary = []
-            for tid, tk in self.tasks.items():
-                if tk.name == "manager_task":
-                    continue
-                task_info = {
-                    "task_id": tid,
-                    "name": tk.name,
-                    "description": tk.description,
-                    "status": tk.status if tk.status else "not started",
-                    "agent": tk.agent.name if tk.agent else "No agent"
-                }
-                tasks_summary.append(task_info)
-                logging.info(f"Task {tid} status: {task_info}")
+        logger.info("Need to complete %s tasks (excluding manager task)", total_tasks)
+        summary_cache = {}
 
-            manager_prompt = f"""
-Here is the current status of all tasks except yours (manager_task):
-{tasks_summary}
+        while len(completed_ids) < total_tasks:
+            tasks_summary = self._summarize_tasks(summary_cache)
 
-Provide a JSON with the structure:
-{{
-   "task_id": <int>,
-   "agent_name": "<string>",
-   "action": "<execute or stop>"
-}}
-"""
+            manager_prompt = MANAGER_PROMPT_HEAD + tasks_summary + MANAGER_PROMPT_TAIL
 
             try:
-                logging.info("Requesting manager instructions...")
+                logger.info("Requesting manager instructions...")
                 if manager_task.async_execution:
                     manager_response = await client.beta.chat.completions.parse(
                         model=self.manager_llm,
@@ -481,7 +740,7 @@ Provide a JSON with the structure:
                             {"role": "user", "content": manager_prompt}
                         ],
                         temperature=0.7,
-                        response_format=ManagerInstructions
+                        response_format=ManagerPlan
                     )
                 else:
                     manager_response = client.beta.chat.completions.parse(
@@ -491,62 +750,74 @@ Provide a JSON with the structure:
                             {"role": "user", "content": manager_prompt}
                         ],
                         temperature=0.7,
-                        response_format=ManagerInstructions
+                        response_format=ManagerPlan
                     )
-                parsed_instructions = manager_response.choices[0].message.parsed
-                logging.info(f"Manager instructions: {parsed_instructions}")
+                plan = manager_response.choices[0].message.parsed
+                logger.info("Manager plan: %s", plan)
             except Exception as e:
                 display_error(f"Manager parse error: {e}")
-                logging.error(f"Manager parse error: {str(e)}", exc_info=True)
+                logger.error("Manager parse error: %s", e, exc_info=True)
                 break
 
-            selected_task_id = parsed_instructions.task_id
-            selected_agent_name = parsed_instructions.agent_name
-            action = parsed_instructions.action
-
-            logging.info(f"Manager selected task_id={selected_task_id}, agent={selected_agent_name}, action={action}")
-
-            if action.lower() == "stop":
-                logging.info("Manager decided to stop task execution")
+            if not plan.assignments:
+                logger.info("Manager decided to stop task execution")
                 break
 
-            if selected_task_id not in self.tasks:
-                error_msg = f"Manager selected invalid task id {selected_task_id}"
-                display_error(error_msg)
-                logging.error(error_msg)
-                break
-
-            original_agent = self.tasks[selected_task_id].agent.name if self.tasks[selected_task_id].agent else "None"
-            for a in self.agents:
-                if a.name == selected_agent_name:
-                    self.tasks[selected_task_id].agent = a
-                    logging.info(f"Changed agent for task {selected_task_id} from {original_agent} to {selected_agent_name}")
+            # Follow the plan without asking the manager again; replan only
+            # once it is used up or one of its tasks doesn't complete
+            stop = False
+            progress = False
+            for assignment in plan.assignments:
+                selected_task_id = assignment.task_id
+                selected_agent_name = assignment.agent_name
+                logger.info("Manager selected task_id=%s, agent=%s", selected_task_id, selected_agent_name)
+
+                if selected_task_id in completed_ids:
+                    # Listed twice, or already completed under an earlier plan
+                    continue
+                if selected_task_id not in self.tasks:
+                    error_msg = f"Manager selected invalid task id {selected_task_id}"
+                    display_error(error_msg)
+                    logger.error(error_msg)
+                    stop = True
                     break
 
-            if self.tasks[selected_task_id].status != "completed":
-                logging.info(f"Starting execution of task {selected_task_id}")
-                yield selected_task_id
-                logging.info(f"Finished execution of task {selected_task_id}, status: {self.tasks[selected_task_id].status}")
+                original_agent = self.tasks[selected_task_id].agent.name if self.tasks[selected_task_id].agent else "None"
+                selected_agent = self._get_agent(selected_agent_name)
+                if selected_agent is not None:
+                    self.tasks[selected_task_id].agent = selected_agent
+                    logger.info("Changed agent for task %s from %s to %s", selected_task_id, original_agent, selected_agent_name)
 
-            if self.tasks[selected_task_id].status == "completed":
-                completed_count += 1
-                logging.info(f"Task {selected_task_id} completed. Total completed: {completed_count}/{total_tasks}")
+                if self.tasks[selected_task_id].status != "completed":
+                    logger.info("Starting execution of task %s", selected_task_id)
+                    yield selected_task_id
+                    logger.info("Finished execution of task %s, status: %s", selected_task_id, self.tasks[selected_task_id].status)
+
+                if self.tasks[selected_task_id].status != "completed":
+                    logger.info("Task %s did not complete, asking the manager for a new plan", selected_task_id)
+                    progress = True
+                    break
+                completed_ids.add(selected_task_id)
+                progress = True
+                logger.info("Task %s completed. Total completed: %s/%s", selected_task_id, len(completed_ids), total_tasks)
+                if len(completed_ids) >= total_tasks:
+                    break
+            if stop:
+                break
+            if not progress:
+                logger.info("Manager plan only lists completed tasks, stopping task execution")
+                break
 
-        self.tasks[manager_task.id].status = "completed"
+        self._set_status(self.tasks[manager_task.id], "completed")
         if self.verbose >= 1:
-            logging.info("All tasks completed under manager supervision.")
-        logging.info("Hierarchical task execution finished")
+            logger.info("All tasks completed under manager supervision.")
+        logger.info("Hierarchical task execution finished")
 
     def workflow(self):
         """Synchronous version of workflow method"""
         current_iter = 0  # Track how many times we've looped
         # Build workflow relationships first
-        for task in self.tasks.values():
-            if task.next_tasks:
-                for next_task_name in task.next_tasks:
-                    next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
-                    if next_task:
-                        next_task.previous_tasks.append(task.name)
+        self._build_graph()
 
         # Find start task
         start_task = None
@@ -556,8 +827,8 @@ Provide a JSON with the structure:
                 break
 
         if not start_task:
-            start_task = list(self.tasks.values())[0]
-            logging.info("No start task marked, using first task")
+            start_task = next(iter(self.tasks.values()))
+            logger.info("No start task marked, using first task")
 
         # If loop type and no input_file, default to tasks.csv
         if start_task and start_task.task_type == "loop" and not start_task.input_file:
@@ -570,12 +841,25 @@ Provide a JSON with the structure:
                 new_tasks = []
 
                 if file_ext == ".csv":
-                    with open(start_task.input_file, "r", encoding="utf-8") as f:
-                        reader = csv.reader(f, quotechar='"', escapechar='\\')  # Handle quoted/escaped fields
-                        previous_task = None
-                        task_count = 0
-
-                        for i, row in enumerate(reader):
+                    previous_task = None
+                    task_count = 0
+
+                    # Values common to every row task (each task gets its own copies of the
+                    # target lists); inherit next_tasks from parent loop task
+                    inherited_next_tasks = start_task.next_tasks if start_task.next_tasks else []
+                    done_targets = inherited_next_tasks if inherited_next_tasks else ["next"]
+                    expected_output = getattr(start_task, 'expected_output', None)
+                    row_agent = start_task.agent
+                    add_task = self._add_task
+                    desc_prefix = f"{start_task.description}\n" if start_task.description else ""
+                    name_prefix = f"{start_task.name}_" if start_task.name else None
+                    # All rows have the same condition keys, so they share one decision model
+                    decision_model = None
+
+                    # Rows are turned into tasks as the file is read
+                    with open(start_task.input_file, "r", encoding="utf-8", newline="") as f:
+                        rows = csv.reader(f, quotechar='"', escapechar='\\')  # Handle quoted/escaped fields
+                        for i, row in enumerate(rows):
                             if not row:  # Skip truly empty rows
                                 continue
 
@@ -591,26 +875,25 @@ Provide a JSON with the structure:
                                 continue
 
                             task_count += 1
-                            logging.debug(f"Processing CSV row {i+1}: {task_desc}")
-
-                            # Inherit next_tasks from parent loop task
-                            inherited_next_tasks = start_task.next_tasks if start_task.next_tasks else []
+                            logger.debug("Processing CSV row %s: %s", i+1, task_desc)
 
                             row_task = Task(
-                                description=f"{start_task.description}\n{task_desc}" if start_task.description else task_desc,
-                                agent=start_task.agent,
-                                name=f"{start_task.name}_{task_count}" if start_task.name else task_desc,
-                                expected_output=getattr(start_task, 'expected_output', None),
+                                description=desc_prefix + task_desc,
+                                agent=row_agent,
+                                name=f"{name_prefix}{task_count}" if name_prefix else task_desc,
+                                expected_output=expected_output,
                                 is_start=(task_count == 1),
                                 task_type="decision",  # Change to decision type
-                                next_tasks=inherited_next_tasks,  # Inherit parent's next tasks
+                                next_tasks=list(inherited_next_tasks),  # Inherit parent's next tasks
                                 condition={
-                                    "done": inherited_next_tasks if inherited_next_tasks else ["next"],  # Use full inherited_next_tasks
+                                    "done": list(done_targets),  # Use full inherited_next_tasks
                                     "retry": ["current"],
                                     "exit": []  # Empty list for exit condition
-                                }
+                                },
+                                output_pydantic=decision_model
                             )
-                            self.tasks[row_task.id] = row_task
+                            decision_model = row_task.output_pydantic
+                            add_task(row_task, start_task)
                             new_tasks.append(row_task)
 
                             if previous_task:
@@ -620,76 +903,54 @@ Provide a JSON with the structure:
 
                             # For the last task in the loop, ensure it points to parent's next tasks
                             if task_count > 0 and not row_task.next_tasks:
-                                row_task.next_tasks = inherited_next_tasks
+                                row_task.next_tasks = list(inherited_next_tasks)
 
-                        logging.info(f"Processed {task_count} rows from CSV file")
+                    logger.info("Processed %s rows from CSV file", task_count)
                 else:
-                    # If not CSV, read lines
-                    with open(start_task.input_file, "r", encoding="utf-8") as f:
-                        lines = f.read().splitlines()
-                        previous_task = None
-                        for i, line in enumerate(lines):
-                            row_task = Task(
-                                description=f"{start_task.description}\n{line.strip()}" if start_task.description else line.strip(),
-                                agent=start_task.agent,
-                                name=f"{start_task.name}_{i+1}" if start_task.name else line.strip(),
-                                expected_output=getattr(start_task, 'expected_output', None),
-                                is_start=(i == 0),
-                                task_type="task",
-                                condition={
-                                    "complete": ["next"],
-                                    "retry": ["current"]
-                                }
-                            )
-                            self.tasks[row_task.id] = row_task
-                            new_tasks.append(row_task)
-
-                            if previous_task:
-                                previous_task.next_tasks = [row_task.name]
-                                previous_task.condition["complete"] = [row_task.name]
-                            previous_task = row_task
+                    new_tasks = self._build_loop_subtasks(start_task)
 
                 if new_tasks:
                     start_task = new_tasks[0]
-                    logging.info(f"Created {len(new_tasks)} tasks from: {start_task.input_file}")
+                    logger.info("Created %s tasks from: %s", len(new_tasks), start_task.input_file)
             except Exception as e:
-                logging.error(f"Failed to read file tasks: {e}")
+                logger.error("Failed to read file tasks: %s", e)
 
         # end of start task handling
         current_task = start_task
         visited_tasks = set()
-        loop_data = {}  # Store loop-specific data
 
         while current_task:
             current_iter += 1
             if current_iter > self.max_iter:
-                logging.info(f"Max iteration limit {self.max_iter} reached, ending workflow.")
+                logger.info("Max iteration limit %s reached, ending workflow.", self.max_iter)
                 break
 
             # ADDED: Check workflow finished flag at the start of each cycle
             if self.workflow_finished:
-                logging.info("Workflow finished early as all tasks are completed.")
+                logger.info("Workflow finished early as all tasks are completed.")
                 break
 
             # Add task summary at start of each cycle
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                status_counts, type_counts = self._count_tasks()
+                logger.debug(f"""
 === Workflow Cycle {current_iter} Summary ===
 Total tasks: {len(self.tasks)}
-Outstanding tasks: {sum(1 for t in self.tasks.values() if t.status != "completed")}
-Completed tasks: {sum(1 for t in self.tasks.values() if t.status == "completed")}
+Outstanding tasks: {len(self.tasks) - status_counts["completed"]}
+Completed tasks: {status_counts["completed"]}
 Tasks by status:
-- Not started: {sum(1 for t in self.tasks.values() if t.status == "not started")}
-- In progress: {sum(1 for t in self.tasks.values() if t.status == "in_progress")}
-- Completed: {sum(1 for t in self.tasks.values() if t.status == "completed")}
+- Not started: {status_counts["not started"]}
+- In progress: {status_counts["in progress"]}
+- Completed: {status_counts["completed"]}
 Tasks by type:
-- Loop tasks: {sum(1 for t in self.tasks.values() if t.task_type == "loop")}
-- Decision tasks: {sum(1 for t in self.tasks.values() if t.task_type == "decision")}
-- Regular tasks: {sum(1 for t in self.tasks.values() if t.task_type not in ["loop", "decision"])}
-            """)
+- Loop tasks: {type_counts["loop"]}
+- Decision tasks: {type_counts["decision"]}
+- Regular tasks: {type_counts["regular"]}
+                """)
 
             # ADDED: Check if all tasks are completed and set workflow_finished flag
-            if all(task.status == "completed" for task in self.tasks.values()):
-                logging.info("All tasks are completed.")
+            if self._all_tasks_completed():
+                logger.info("All tasks are completed.")
                 self.workflow_finished = True
                 # The next iteration loop check will break the workflow
 
@@ -697,76 +958,16 @@ Tasks by type:
             # Handle loop task file reading at runtime
             if (current_task.task_type == "loop" and
                 current_task is not start_task and
-                getattr(current_task, "_subtasks_created", False) is not True):
+                not getattr(current_task, "_subtasks_created", False)):
 
                 if not current_task.input_file:
                     current_task.input_file = "tasks.csv"
 
-                if getattr(current_task, "input_file", None):
-                    try:
-                        file_ext = os.path.splitext(current_task.input_file)[1].lower()
-                        new_tasks = []
-
-                        if file_ext == ".csv":
-                            with open(current_task.input_file, "r", encoding="utf-8") as f:
-                                reader = csv.reader(f)
-                                previous_task = None
-                                for i, row in enumerate(reader):
-                                    if row:  # Skip empty rows
-                                        task_desc = row[0]  # Take first column
-                                        row_task = Task(
-                                            description=f"{current_task.description}\n{task_desc}" if current_task.description else task_desc,
-                                            agent=current_task.agent,
-                                            name=f"{current_task.name}_{i+1}" if current_task.name else task_desc,
-                                            expected_output=getattr(current_task, 'expected_output', None),
-                                            is_start=(i == 0),
-                                            task_type="task",
-                                            condition={
-                                                "complete": ["next"],
-                                                "retry": ["current"]
-                                            }
-                                        )
-                                        self.tasks[row_task.id] = row_task
-                                        new_tasks.append(row_task)
-
-                                        if previous_task:
-                                            previous_task.next_tasks = [row_task.name]
-                                            previous_task.condition["complete"] = [row_task.name]
-                                        previous_task = row_task
-                        else:
-                            with open(current_task.input_file, "r", encoding="utf-8") as f:
-                                lines = f.read().splitlines()
-                                previous_task = None
-                                for i, line in enumerate(lines):
-                                    row_task = Task(
-                                        description=f"{current_task.description}\n{line.strip()}" if current_task.description else line.strip(),
-                                        agent=current_task.agent,
-                                        name=f"{current_task.name}_{i+1}" if current_task.name else line.strip(),
-                                        expected_output=getattr(current_task, 'expected_output', None),
-                                        is_start=(i == 0),
-                                        task_type="task",
-                                        condition={
-                                            "complete": ["next"],
-                                            "retry": ["current"]
-                                        }
-                                    )
-                                    self.tasks[row_task.id] = row_task
-                                    new_tasks.append(row_task)
-
-                                    if previous_task:
-                                        previous_task.next_tasks = [row_task.name]
-                                        previous_task.condition["complete"] = [row_task.name]
-                                    previous_task = row_task
-
-                        if new_tasks:
-                            current_task.next_tasks = [new_tasks[0].name]
-                            current_task._subtasks_created = True
-                            logging.info(f"Created {len(new_tasks)} tasks from: {current_task.input_file} for loop task {current_task.name}")
-                    except Exception as e:
-                        logging.error(f"Failed to read file tasks for loop task {current_task.name}: {e}")
+                self._create_loop_subtasks(current_task)
 
             task_id = current_task.id
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"""
 === Task Execution Details ===
 Current task: {current_task.name}
 Type: {current_task.task_type}
@@ -775,34 +976,32 @@ Previous tasks: {current_task.previous_tasks}
 Next tasks: {current_task.next_tasks}
 Context tasks: {[t.name for t in current_task.context] if current_task.context else []}
 Description length: {len(current_task.description)}
-            """)
+                """)
 
             # Add context from previous tasks to description
             if current_task.previous_tasks or current_task.context:
-                context = "\nInput data from previous tasks:"
+                context_parts = ["\nInput data from previous tasks:"]
 
                 # Add data from previous tasks in workflow
                 for prev_name in current_task.previous_tasks:
-                    prev_task = next((t for t in self.tasks.values() if t.name == prev_name), None)
+                    prev_task = self._tasks_by_name.get(prev_name)
                     if prev_task and prev_task.result:
-                        # Handle loop data
-                        if current_task.task_type == "loop":
-                            context += f"\n{prev_name}: {prev_task.result.raw}"
-                        else:
-                            context += f"\n{prev_name}: {prev_task.result.raw}"
+                        context_parts.append(f"\n{prev_name}: {prev_task.result.raw}")
 
                 # Add data from context tasks
                 if current_task.context:
                     for ctx_task in current_task.context:
                         if ctx_task.result and ctx_task.name != current_task.name:
-                            context += f"\n{ctx_task.name}: {ctx_task.result.raw}"
+                            context_parts.append(f"\n{ctx_task.name}: {ctx_task.result.raw}")
 
                 # Update task description with context
-                current_task.description = current_task.description + context
+                current_task.description = current_task.description + "".join(context_parts)
+                self._with_context.add(current_task.id)
 
             # Skip execution for loop tasks, only process their subtasks
             if current_task.task_type == "loop":
-                logging.debug(f"""
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"""
 === Loop Task Details ===
 Name: {current_task.name}
 ID: {current_task.id}
@@ -811,42 +1010,41 @@ Next tasks: {current_task.next_tasks}
 Condition: {current_task.condition}
 Subtasks created: {getattr(current_task, '_subtasks_created', False)}
 Input file: {getattr(current_task, 'input_file', None)}
-                """)
+                    """)
 
                 # Check if subtasks are created and completed
                 if getattr(current_task, "_subtasks_created", False):
-                    subtasks = [
-                        t for t in self.tasks.values()
-                        if t.name.startswith(current_task.name + "_")
-                    ]
+                    subtasks = self._subtasks_by_parent.get(current_task.name, [])
 
-                    logging.debug(f"""
+                    if logger.isEnabledFor(logging.DEBUG):
+                        completed_subtasks = sum(1 for st in subtasks if st.status == "completed")
+                        logger.debug(f"""
 === Subtask Status Check ===
 Total subtasks: {len(subtasks)}
-Completed: {sum(1 for st in subtasks if st.status == "completed")}
-Pending: {sum(1 for st in subtasks if st.status != "completed")}
-                    """)
+Completed: {completed_subtasks}
+Pending: {len(subtasks) - completed_subtasks}
+                        """)
 
-                    for st in subtasks:
-                        logging.debug(f"""
+                        for st in subtasks:
+                            logger.debug(f"""
 Subtask: {st.name}
 - Status: {st.status}
 - Next tasks: {st.next_tasks}
 - Condition: {st.condition}
-                        """)
+                            """)
 
-                    if subtasks and all(st.status == "completed" for st in subtasks):
-                        logging.debug(f"=== All {len(subtasks)} subtasks completed for {current_task.name} ===")
+                    if subtasks and not self._has_pending_subtasks(current_task.name):
+                        logger.debug("=== All %s subtasks completed for %s ===", len(subtasks), current_task.name)
 
                         # Mark loop task completed and move to next task
-                        current_task.status = "completed"
-                        logging.debug(f"Loop {current_task.name} marked as completed")
+                        self._set_status(current_task, "completed")
+                        logger.debug("Loop %s marked as completed", current_task.name)
 
                         # Set result for loop task when all subtasks complete
                         if not current_task.result:
-                            # Get result from last completed subtask
-                            last_subtask = next((t for t in reversed(subtasks) if t.status == "completed"), None)
-                            if last_subtask and last_subtask.result:
+                            # Get result from last completed subtask (all of them are completed here)
+                            last_subtask = subtasks[-1]
+                            if last_subtask.result:
                                 current_task.result = last_subtask.result
                         
                         # Route to next task based on condition
@@ -860,15 +1058,15 @@ Subtask: {st.name}
                                     decision_str = current_task.result.raw.lower()
                             
                             # For loop tasks, use "done" to follow condition path
-                            if current_task.task_type == "loop" and all(t.status == "completed" for t in subtasks):
+                            if current_task.task_type == "loop":
                                 decision_str = "done"
                             
-                            target_tasks = current_task.condition.get(decision_str, []) if decision_str else []
+                            target_tasks = self._get_condition_target(current_task, decision_str) if decision_str else []
                             task_value = target_tasks[0] if isinstance(target_tasks, list) else target_tasks
-                            next_task = next((t for t in self.tasks.values() if t.name == task_value), None)
+                            next_task = self._tasks_by_name.get(task_value)
                             if next_task:
-                                next_task.status = "not started"  # Reset status to allow execution
-                                logging.debug(f"Routing to {next_task.name} based on decision: {decision_str}")
+                                self._set_status(next_task, "not started")  # Reset status to allow execution
+                                logger.debug("Routing to %s based on decision: %s", next_task.name, decision_str)
                                 self.workflow_finished = False
                                 current_task = next_task
                                 # Ensure the task is yielded for execution
@@ -877,83 +1075,63 @@ Subtask: {st.name}
                                     visited_tasks.add(current_task.id)
                             else:
                                 # End workflow if no valid next task found
-                                logging.info(f"No valid next task found for decision: {decision_str}")
+                                logger.info("No valid next task found for decision: %s", decision_str)
                                 self.workflow_finished = True
                                 current_task = None
                                 break
                 else:
-                    logging.debug(f"No subtasks created yet for {current_task.name}")
+                    logger.debug("No subtasks created yet for %s", current_task.name)
                     # Create subtasks if needed
                     if current_task.input_file:
                         self._create_loop_subtasks(current_task)
                         current_task._subtasks_created = True
-                        logging.debug(f"Created subtasks from {current_task.input_file}")
+                        logger.debug("Created subtasks from %s", current_task.input_file)
                     else:
                         # No input file, mark as done
-                        current_task.status = "completed"
-                        logging.debug(f"No input file, marking {current_task.name} as completed")
+                        self._set_status(current_task, "completed")
+                        logger.debug("No input file, marking %s as completed", current_task.name)
                         if current_task.next_tasks:
                             next_task_name = current_task.next_tasks[0]
-                            next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
+                            next_task = self._tasks_by_name.get(next_task_name)
                             current_task = next_task
                         else:
                             current_task = None
             else:
                 # Execute non-loop task
-                logging.debug(f"=== Executing non-loop task: {current_task.name} (id: {task_id}) ===")
-                logging.debug(f"Task status: {current_task.status}")
-                logging.debug(f"Task next_tasks: {current_task.next_tasks}")
+                logger.debug("=== Executing non-loop task: %s (id: %s) ===", current_task.name, task_id)
+                logger.debug("Task status: %s", current_task.status)
+                logger.debug("Task next_tasks: %s", current_task.next_tasks)
                 yield task_id
                 visited_tasks.add(task_id)
 
                 # Only end workflow if no next_tasks AND no conditions
-                if not current_task.next_tasks and not current_task.condition and not any(
-                    t.task_type == "loop" and current_task.name.startswith(t.name + "_")
-                    for t in self.tasks.values()
-                ):
-                    logging.info(f"Task {current_task.name} has no next tasks, ending workflow")
+                if (not current_task.next_tasks and not current_task.condition and
+                    current_task.id not in self._subtask_parent):
+                    logger.info("Task %s has no next tasks, ending workflow", current_task.name)
                     self.workflow_finished = True
                     current_task = None
                     break
 
             # Reset completed task to "not started" so it can run again
-            if self.tasks[task_id].status == "completed":
+            task_to_check = self.tasks[task_id]
+            if task_to_check.status == "completed":
                 # Never reset loop tasks, decision tasks, or their subtasks if rerun is False
-                subtask_name = self.tasks[task_id].name
-                task_to_check = self.tasks[task_id]
-                logging.debug(f"=== Checking reset for completed task: {subtask_name} ===")
-                logging.debug(f"Task type: {task_to_check.task_type}")
-                logging.debug(f"Task status before reset check: {task_to_check.status}")
-                logging.debug(f"Task rerun: {getattr(task_to_check, 'rerun', True)}") # default to True if not set
-
-                if (getattr(task_to_check, 'rerun', True) and # Corrected condition - reset only if rerun is True (or default True)
+                subtask_name = task_to_check.name
+                logger.debug("=== Checking reset for completed task: %s ===", subtask_name)
+                logger.debug("Task type: %s", task_to_check.task_type)
+                logger.debug("Task status before reset check: %s", task_to_check.status)
+                logger.debug("Task rerun: %s", getattr(task_to_check, 'rerun', True)) # default to True if not set
+
+                if (task_id not in self._subtask_parent and # Loop subtasks are indexed when created
                     task_to_check.task_type != "loop" and # Removed "decision" from exclusion
-                    not any(t.task_type == "loop" and subtask_name.startswith(t.name + "_")
-                           for t in self.tasks.values())):
-                    logging.debug(f"=== Resetting non-loop, non-decision task {subtask_name} to 'not started' ===")
-                    self.tasks[task_id].status = "not started"
-                    logging.debug(f"Task status after reset: {self.tasks[task_id].status}")
+                    getattr(task_to_check, 'rerun', True)): # Corrected condition - reset only if rerun is True (or default True)
+                    logger.debug("=== Resetting non-loop, non-decision task %s to 'not started' ===", subtask_name)
+                    self._set_status(task_to_check, "not started")
+                    logger.debug("Task status after reset: %s", task_to_check.status)
                 else:
-                    logging.debug(f"=== Skipping reset for loop/decision/subtask or rerun=False: {subtask_name} ===")
-                    logging.debug(f"Keeping status as: {self.tasks[task_id].status}")
-
+                    logger.debug("=== Skipping reset for loop/decision/subtask or rerun=False: %s ===", subtask_name)
+                    logger.debug("Keeping status as: %s", task_to_check.status)
 
-            # Handle loop progression
-            if current_task.task_type == "loop":
-                loop_key = f"loop_{current_task.name}"
-                if loop_key in loop_data:
-                    loop_info = loop_data[loop_key]
-                    loop_info["index"] += 1
-                    has_more = loop_info["remaining"] > 0
-
-                    # Update result to trigger correct condition
-                    if current_task.result:
-                        result = current_task.result.raw
-                        if has_more:
-                            result += "\nmore"
-                        else:
-                            result += "\ndone"
-                        current_task.result.raw = result
 
             # Determine next task based on result
             next_task = None
@@ -967,76 +1145,78 @@ Subtask: {st.name}
                     # Check if task has conditions and next_tasks
                     if current_task.condition:
                         # Get target task based on decision
-                        target_tasks = current_task.condition.get(decision_str, [])
+                        target_tasks = self._get_condition_target(current_task, decision_str)
                         # Handle all forms of exit conditions
                         if not target_tasks or target_tasks == "exit" or (isinstance(target_tasks, list) and (not target_tasks or target_tasks[0] == "exit")):
-                            logging.info(f"Workflow exit condition met on decision: {decision_str}")
+                            logger.info("Workflow exit condition met on decision: %s", decision_str)
                             self.workflow_finished = True
                             current_task = None
                             break
                         else:
                             # Find the target task by name
                             task_value = target_tasks[0] if isinstance(target_tasks, list) else target_tasks
-                            next_task = next((t for t in self.tasks.values() if t.name == task_value), None)
+                            next_task = self._tasks_by_name.get(task_value)
                             if next_task:
-                                next_task.status = "not started"  # Reset status to allow execution
-                                logging.debug(f"Routing to {next_task.name} based on decision: {decision_str}")
+                                self._set_status(next_task, "not started")  # Reset status to allow execution
+                                logger.debug("Routing to %s based on decision: %s", next_task.name, decision_str)
                                 # Don't mark workflow as finished when following condition path
                                 self.workflow_finished = False
 
             # If no condition-based routing, use next_tasks
             if not next_task and current_task and current_task.next_tasks:
                 next_task_name = current_task.next_tasks[0]
-                next_task = next((t for t in self.tasks.values() if t.name == next_task_name), None)
+                next_task = self._tasks_by_name.get(next_task_name)
                 if next_task:
                     # Reset the next task to allow re-execution
-                    next_task.status = "not started"
+                    self._set_status(next_task, "not started")
                     # Don't mark workflow as finished if we're in a task loop
                     if (next_task.previous_tasks and current_task.name in next_task.previous_tasks and 
                         next_task.next_tasks and 
                         next_task.next_tasks[0] in self.tasks and 
                         next_task.name in self.tasks[next_task.next_tasks[0]].previous_tasks):
                         self.workflow_finished = False
-                    logging.debug(f"Following next_tasks to {next_task.name}")
+                    logger.debug("Following next_tasks to %s", next_task.name)
 
-            current_task = next_task
-            if not current_task:
-                current_task = self._find_next_not_started_task() # General fallback if no next task in workflow
+            # General fallback if no next task in workflow
+            current_task = next_task or self._find_next_not_started_task()
 
 
             if not current_task:
                 # Add final workflow summary
-                logging.debug(f"""
+                if logger.isEnabledFor(logging.DEBUG):
+                    status_counts, type_counts = self._count_tasks()
+                    logger.debug(f"""
 === Final Workflow Summary ===
 Total tasks processed: {len(self.tasks)}
 Final status:
-- Completed tasks: {sum(1 for t in self.tasks.values() if t.status == "completed")}
-- Outstanding tasks: {sum(1 for t in self.tasks.values() if t.status != "completed")}
+- Completed tasks: {status_counts["completed"]}
+- Outstanding tasks: {len(self.tasks) - status_counts["completed"]}
 Tasks by status:
-- Not started: {sum(1 for t in self.tasks.values() if t.status == "not started")}
-- In progress: {sum(1 for t in self.tasks.values() if t.status == "in_progress")}
-- Completed: {sum(1 for t in self.tasks.values() if t.status == "completed")}
-- Failed: {sum(1 for t in self.tasks.values() if t.status == "failed")}
+- Not started: {status_counts["not started"]}
+- In progress: {status_counts["in progress"]}
+- Completed: {status_counts["completed"]}
+- Failed: {status_counts["failed"]}
 Tasks by type:
-- Loop tasks: {sum(1 for t in self.tasks.values() if t.task_type == "loop")}
-- Decision tasks: {sum(1 for t in self.tasks.values() if t.task_type == "decision")}
-- Regular tasks: {sum(1 for t in self.tasks.values() if t.task_type not in ["loop", "decision"])}
+- Loop tasks: {type_counts["loop"]}
+- Decision tasks: {type_counts["decision"]}
+- Regular tasks: {type_counts["regular"]}
 Total iterations: {current_iter}
 Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
-                """)
+                    """)
 
-                logging.info("Workflow execution completed")
+                logger.info("Workflow execution completed")
                 break
 
             # Add completion logging
-            logging.debug(f"""
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"""
 === Task Completion ===
 Task: {current_task.name}
 Final status: {current_task.status}
 Next task: {next_task.name if next_task else None}
 Iteration: {current_iter}/{self.max_iter}
 Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
-            """)
+                """)
 
     def sequential(self):
         """Synchronous version of sequential method"""
@@ -1046,7 +1226,7 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
 
     def hierarchical(self):
         """Synchronous version of hierarchical method"""
-        logging.debug(f"Starting hierarchical task execution with {len(self.tasks)} tasks")
+        logger.debug("Starting hierarchical task execution with %s tasks", len(self.tasks))
         manager_agent = Agent(
             name="Manager",
             role="Project manager",
@@ -1058,11 +1238,6 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
             self_reflect=False
         )
 
-        class ManagerInstructions(BaseModel):
-            task_id: int
-            agent_name: str
-            action: str
-
         manager_task = Task(
             name="manager_task",
             description="Decide the order of tasks and which agent executes them",
@@ -1070,41 +1245,20 @@ Workflow Finished: {self.workflow_finished} # ADDED: Workflow Finished Status
             agent=manager_agent
         )
         manager_task_id = yield manager_task
-        logging.info(f"Created manager task with ID {manager_task_id}")
+        logger.info("Created manager task with ID %s", manager_task_id)
 
-        completed_count = 0
+        completed_ids = set()
         total_tasks = len(self.tasks) - 1
-        logging.info(f"Need to complete {total_tasks} tasks (excluding manager task)")
-
-        while completed_count < total_tasks:
-            tasks_summary = []
-            for tid, tk in self.tasks.items():
-                if tk.name == "manager_task":
-                    continue
-                task_info = {
-                    "task_id": tid,
-                    "name": tk.name,
-                    "description": tk.description,
-                    "status": tk.status if tk.status else "not started",
-                    "agent": tk.agent.name if tk.agent else "No agent"
-                }
-                tasks_summary.append(task_info)
-                logging.info(f"Task {tid} status: {task_info}")
+        logger.info("Need to complete %s tasks (excluding manager task)", total_tasks)
+        summary_cache = {}
 
-            manager_prompt = f"""
-Here is the current status of all tasks except yours (manager_task):
-{tasks_summary}
+        while len(completed_ids) < total_tasks:
+            tasks_summary = self._summarize_tasks(summary_cache)
 
-Provide a JSON with the structure:
-{{
-   "task_id": <int>,
-   "agent_name": "<string>",
-   "action": "<execute or stop>"
-}}
-"""
+            manager_prompt = MANAGER_PROMPT_HEAD + tasks_summary + MANAGER_PROMPT_TAIL
 
             try:
-                logging.info("Requesting manager instructions...")
+                logger.info("Requesting manager instructions...")
                 manager_response = client.beta.chat.completions.parse(
                     model=self.manager_llm,
                     messages=[
@@ -1112,48 +1266,65 @@ Provide a JSON with the structure:
                         {"role": "user", "content": manager_prompt}
                     ],
                     temperature=0.7,
-                    response_format=ManagerInstructions
+                    response_format=ManagerPlan
                 )
-                parsed_instructions = manager_response.choices[0].message.parsed
-                logging.info(f"Manager instructions: {parsed_instructions}")
+                plan = manager_response.choices[0].message.parsed
+                logger.info("Manager plan: %s", plan)
             except Exception as e:
                 display_error(f"Manager parse error: {e}")
-                logging.error(f"Manager parse error: {str(e)}", exc_info=True)
-                break
-
-            selected_task_id = parsed_instructions.task_id
-            selected_agent_name = parsed_instructions.agent_name
-            action = parsed_instructions.action
-
-            logging.info(f"Manager selected task_id={selected_task_id}, agent={selected_agent_name}, action={action}")
-
-            if action.lower() == "stop":
-                logging.info("Manager decided to stop task execution")
+                logger.error("Manager parse error: %s", e, exc_info=True)
                 break
 
-            if selected_task_id not in self.tasks:
-                error_msg = f"Manager selected invalid task id {selected_task_id}"
-                display_error(error_msg)
-                logging.error(error_msg)
+            if not plan.assignments:
+                logger.info("Manager decided to stop task execution")
                 break
 
-            original_agent = self.tasks[selected_task_id].agent.name if self.tasks[selected_task_id].agent else "None"
-            for a in self.agents:
-                if a.name == selected_agent_name:
-                    self.tasks[selected_task_id].agent = a
-                    logging.info(f"Changed agent for task {selected_task_id} from {original_agent} to {selected_agent_name}")
+            # Follow the plan without asking the manager again; replan only
+            # once it is used up or one of its tasks doesn't complete
+            stop = False
+            progress = False
+            for assignment in plan.assignments:
+                selected_task_id = assignment.task_id
+                selected_agent_name = assignment.agent_name
+                logger.info("Manager selected task_id=%s, agent=%s", selected_task_id, selected_agent_name)
+
+                if selected_task_id in completed_ids:
+                    # Listed twice, or already completed under an earlier plan
+                    continue
+                if selected_task_id not in self.tasks:
+                    error_msg = f"Manager selected invalid task id {selected_task_id}"
+                    display_error(error_msg)
+                    logger.error(error_msg)
+                    stop = True
                     break
 
-            if self.tasks[selected_task_id].status != "completed":
-                logging.info(f"Starting execution of task {selected_task_id}")
-                yield selected_task_id
-                logging.info(f"Finished execution of task {selected_task_id}, status: {self.tasks[selected_task_id].status}")
+                original_agent = self.tasks[selected_task_id].agent.name if self.tasks[selected_task_id].agent else "None"
+                selected_agent = self._get_agent(selected_agent_name)
+                if selected_agent is not None:
+                    self.tasks[selected_task_id].agent = selected_agent
+                    logger.info("Changed agent for task %s from %s to %s", selected_task_id, original_agent, selected_agent_name)
 
-            if self.tasks[selected_task_id].status == "completed":
-                completed_count += 1
-                logging.info(f"Task {selected_task_id} completed. Total completed: {completed_count}/{total_tasks}")
+                if self.tasks[selected_task_id].status != "completed":
+                    logger.info("Starting execution of task %s", selected_task_id)
+                    yield selected_task_id
+                    logger.info("Finished execution of task %s, status: %s", selected_task_id, self.tasks[selected_task_id].status)
+
+                if self.tasks[selected_task_id].status != "completed":
+                    logger.info("Task %s did not complete, asking the manager for a new plan", selected_task_id)
+                    progress = True
+                    break
+                completed_ids.add(selected_task_id)
+                progress = True
+                logger.info("Task %s completed. Total completed: %s/%s", selected_task_id, len(completed_ids), total_tasks)
+                if len(completed_ids) >= total_tasks:
+                    break
+            if stop:
+                break
+            if not progress:
+                logger.info("Manager plan only lists completed tasks, stopping task execution")
+                break
 
-        self.tasks[manager_task.id].status = "completed"
+        self._set_status(self.tasks[manager_task.id], "completed")
         if self.verbose >= 1:
-            logging.info("All tasks completed under manager supervision.")
-        logging.info("Hierarchical task execution finished")
\ No newline at end of file
+            logger.info("All tasks completed under manager supervision.")
+        logger.info("Hierarchical task execution finished")
\ No newline at end of file
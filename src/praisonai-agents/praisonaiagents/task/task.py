@@ -12,6 +12,18 @@ import time
 logger = logging.getLogger(__name__)
 
 class Task:
+    # Loop workflows create one Task per input row, so attributes live in slots.
+    # Workflow-hot fields come first; "__dict__" keeps arbitrary extra attributes
+    # working (it is only allocated if one is set) and "__weakref__" keeps weakrefs.
+    __slots__ = (
+        "id", "name", "status", "task_type", "next_tasks", "previous_tasks",
+        "condition", "result", "is_start", "description", "context", "agent",
+        "input_file", "rerun", "expected_output", "output_pydantic", "output_json",
+        "async_execution", "tools", "config", "output_file", "callback",
+        "create_directory", "images", "loop_state", "memory", "quality_check",
+        "__dict__", "__weakref__",
+    )
+
     def __init__(
         self,
         description: str,
@@ -72,25 +84,30 @@ class Task:
         self.images = images if images else []
         self.next_tasks = next_tasks if next_tasks else []
         self.task_type = task_type
-        self.condition = condition if condition else {}
+        # Decisions are matched in lowercase, so normalize the keys once here
+        self.condition = {
+            key.lower() if isinstance(key, str) else key: value
+            for key, value in condition.items()
+        } if condition else {}
         self.is_start = is_start
         self.loop_state = loop_state if loop_state else {}
         self.memory = memory
         self.quality_check = quality_check
         self.rerun = rerun # Assigning the rerun parameter
 
-        # Set logger level based on config verbose level
+        # Set logger level based on config verbose level. Logger.setLevel clears the
+        # level cache of every logger, so skip it when the level is already set
+        # (loop workflows create one Task per input row).
         verbose = self.config.get("verbose", 0)
-        if verbose >= 5:
-            logger.setLevel(logging.INFO)
-        else:
-            logger.setLevel(logging.WARNING)
+        level = logging.INFO if verbose >= 5 else logging.WARNING
+        if logger.level != level:
+            logger.setLevel(level)
 
         # Also set third-party loggers to WARNING
-        logging.getLogger('chromadb').setLevel(logging.WARNING)
-        logging.getLogger('openai').setLevel(logging.WARNING)
-        logging.getLogger('httpx').setLevel(logging.WARNING)
-        logging.getLogger('httpcore').setLevel(logging.WARNING)
+        for logger_name in ('chromadb', 'openai', 'httpx', 'httpcore'):
+            third_party_logger = logging.getLogger(logger_name)
+            if third_party_logger.level != logging.WARNING:
+                third_party_logger.setLevel(logging.WARNING)
 
         if self.output_json and self.output_pydantic:
             raise ValueError("Only one output type can be defined")
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from praisonaiagents.agent.agent import Agent
+from praisonaiagents.main import TaskOutput
+from praisonaiagents.process.process import Process
+from praisonaiagents.task.task import Task
+
+
+class TestLoopSubtasks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.tmp_dir, "items.csv")
+        with open(self.input_file, "w") as f:
+            f.write("a\nb\nc\n")
+        self.agent = Agent(name="Worker", role="r", goal="g", backstory="b", llm="gpt-4o-mini")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def build_tasks(self, *tasks):
+        for i, task in enumerate(tasks):
+            task.id = i
+        return {task.id: task for task in tasks}
+
+    def run_workflow(self, tasks):
+        """Run Process.workflow(), completing each yielded task, and return the task names run."""
+        process = Process(tasks=tasks, agents=[self.agent], max_iter=20)
+        trace = []
+        for task_id in process.workflow():
+            task = tasks[task_id]
+            trace.append(task.name)
+            task.result = TaskOutput(description=task.description, raw=f"out-{task.name}", agent=self.agent.name)
+            task.status = "completed"
+        return trace
+
+    def test_task_sharing_loop_prefix_does_not_skip_expansion(self):
+        tasks = self.build_tasks(
+            Task(name="A", description="a", agent=self.agent, is_start=True, next_tasks=["L"]),
+            Task(name="L", description="l", agent=self.agent, task_type="loop", input_file=self.input_file),
+            Task(name="L_report", description="r", agent=self.agent),
+        )
+        trace = self.run_workflow(tasks)
+        for name in ("L_1", "L_2", "L_3"):
+            self.assertIn(name, trace)
+
+    def test_second_process_does_not_expand_loop_again(self):
+        tasks = self.build_tasks(
+            Task(name="s", description="s", agent=self.agent, is_start=True, next_tasks=["lp"]),
+            Task(name="lp", description="l", agent=self.agent, task_type="loop",
+                 input_file=self.input_file, next_tasks=["after"]),
+            Task(name="after", description="a", agent=self.agent),
+        )
+        first = self.run_workflow(tasks)
+        self.assertEqual(len(tasks), 6)
+        for task in tasks.values():
+            task.status = "not started"
+        second = self.run_workflow(tasks)
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual(first, second)
+
+    def test_subtasks_do_not_share_target_lists(self):
+        tasks = self.build_tasks(
+            Task(name="lp", description="l", agent=self.agent, task_type="loop", input_file=self.input_file),
+        )
+        process = Process(tasks=tasks, agents=[self.agent])
+        subtasks = process._build_loop_subtasks(tasks[0])
+        subtasks[0].next_tasks.append("extra")
+        subtasks[-1].condition["retry"].append("extra")
+        self.assertEqual(subtasks[0].condition["complete"], ["lp_2"])
+        self.assertEqual(subtasks[1].condition["retry"], ["current"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,17 @@
 from praisonaiagents import Agent, MCP
 import gradio as gr
 
+# The MCP server is started once and shared; each request gets its own Agent
+# so chat history doesn't leak between users
+_airbnb_mcp = MCP("npx -y @openbnb/mcp-server-airbnb --ignore-robots-txt")
+
 def search_airbnb(query):
     agent = Agent(
         instructions="You help book apartments on Airbnb. 請用中文回答",
         # llm="gpt-4o-mini",
         # llm="ollama/llama3.1", 
         llm="ollama/mistral-small:24b",
-        tools=MCP("npx -y @openbnb/mcp-server-airbnb --ignore-robots-txt")
+        tools=_airbnb_mcp
     )
     result = agent.start(query)
     return f"## Airbnb Search Results\n\n{result}"